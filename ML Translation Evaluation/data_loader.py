@@ -2,10 +2,33 @@
 Data loading module.
 Handles reading CSV files and preparing data for evaluation.
 """
+import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple, Dict
-from config import REQUIRED_COLUMNS
+from typing import List, Tuple, Dict, Optional
+from config import REQUIRED_COLUMNS, CSV_CHUNKSIZE, USE_DATA_CACHE, DATA_CACHE_DIRNAME
+
+# Bump when the cache layout changes, to invalidate old caches
+_CACHE_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize a sentence for token-based metrics (METEOR).
+    
+    Args:
+        text: Sentence to tokenize
+    
+    Returns:
+        List of whitespace-separated tokens
+    """
+    return text.split()
 
 
 class MTDataset:
@@ -13,20 +36,157 @@ class MTDataset:
     Class to handle MT evaluation dataset loading and preparation.
     """
     
-    def __init__(self, filepath: Path):
+    def __init__(
+        self,
+        filepath: Path,
+        chunksize: Optional[int] = CSV_CHUNKSIZE,
+        use_cache: bool = USE_DATA_CACHE
+    ):
         """
         Initialize dataset from CSV file.
         
         Args:
             filepath: Path to the CSV file
+            chunksize: If set, stream the CSV in chunks of this many rows
+                to bound peak memory while loading
+            use_cache: If True, load the parsed table from (or save it to)
+                the parquet cache
         """
-        self.filepath = filepath
-        self.df = pd.read_csv(filepath)
+        self.filepath = Path(filepath)
+        self._df = None
+        # Per-column token lists (one entry per row, None for missing values),
+        # filled lazily so each column is only tokenized once
+        self._tok_cache: Dict[str, List[Optional[List[str]]]] = {}
+        
+        cache_path = self._get_cache_path()
+        loaded_from_cache = use_cache and self._load_cache(cache_path)
+        
+        if not loaded_from_cache:
+            if chunksize:
+                self.table = self._read_csv_chunked(self.filepath, chunksize)
+            else:
+                # Multi-threaded Arrow parsing; literary texts contain quoted newlines
+                self.table = pacsv.read_csv(
+                    str(self.filepath),
+                    read_options=pacsv.ReadOptions(use_threads=True),
+                    parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                    convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+                )
+        
         self._validate_columns()
+        # Non-missing masks per column, computed once and combined per MT system
+        self._valid: Dict[str, np.ndarray] = {
+            column: pc.is_valid(self.table[column]).to_numpy()
+            for column in self.table.column_names
+        }
+        
+        if use_cache and not loaded_from_cache:
+            self._write_cache(cache_path)
+    
+    def _get_cache_path(self) -> Path:
+        """Get the parquet cache path for this dataset's CSV file."""
+        return self.filepath.parent / DATA_CACHE_DIRNAME / f"{self.filepath.stem}.parquet"
+    
+    def _source_metadata(self) -> Dict[bytes, bytes]:
+        """
+        Describe the source CSV and cache format, for cache invalidation.
+        
+        Returns:
+            Parquet schema metadata identifying the CSV version and cache format
+        """
+        stat = self.filepath.stat()
+        return {
+            b'cache_version': str(_CACHE_VERSION).encode(),
+            b'source_size': str(stat.st_size).encode(),
+            b'source_mtime_ns': str(stat.st_mtime_ns).encode()
+        }
+    
+    def _load_cache(self, cache_path: Path) -> bool:
+        """
+        Load the parsed table from the parquet cache if it is up to date.
+        
+        Args:
+            cache_path: Path to the parquet cache file
+        
+        Returns:
+            True if the cache was loaded, False if it is missing, stale or unreadable
+        """
+        if not cache_path.exists():
+            return False
+        
+        expected = self._source_metadata()
+        try:
+            metadata = pq.read_schema(cache_path).metadata or {}
+            if any(metadata.get(key) != value for key, value in expected.items()):
+                return False
+            cached = pq.read_table(cache_path)
+        except (OSError, pa.ArrowInvalid) as e:
+            print(f"Warning: Ignoring unreadable dataset cache {cache_path}: {e}")
+            return False
+        
+        self.table = cached.replace_schema_metadata(None)
+        return True
+    
+    def _write_cache(self, cache_path: Path) -> None:
+        """
+        Save the parsed table to a parquet cache.
+        Tokens are not cached: rebuilding Python token lists from Arrow
+        list columns costs as much as tokenizing again.
+        
+        Args:
+            cache_path: Path to the parquet cache file
+        """
+        cached = self.table.replace_schema_metadata(self._source_metadata())
+        
+        # Write to a temporary file first so an interrupted run never
+        # leaves a truncated cache behind
+        # (a plain per-process path, so the file gets the usual umask permissions)
+        tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(cached, tmp_path, compression='zstd')
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write dataset cache {cache_path}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+    
+    @staticmethod
+    def _read_csv_chunked(filepath: Path, chunksize: int) -> pa.Table:
+        """
+        Read a CSV file chunk by chunk into an Arrow table of string columns.
+        Each pandas chunk is converted and released before the next is read,
+        so no full DataFrame is ever held in memory.
+        
+        Args:
+            filepath: Path to the CSV file
+            chunksize: Number of rows per chunk
+        
+        Returns:
+            Arrow table with the file contents
+        """
+        columns = pd.read_csv(filepath, nrows=0).columns
+        schema = pa.schema([(column, pa.string()) for column in columns])
+        
+        tables = []
+        for chunk in pd.read_csv(filepath, chunksize=chunksize, dtype=str):
+            tables.append(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            del chunk
+        
+        if not tables:
+            return schema.empty_table()
+        return pa.concat_tables(tables)
+    
+    @property
+    def df(self) -> pd.DataFrame:
+        """Dataset as a pandas DataFrame (Arrow-backed, converted on first access)."""
+        if self._df is None:
+            self._df = self.table.to_pandas(types_mapper=pd.ArrowDtype)
+        return self._df
         
     def _validate_columns(self) -> None:
         """Validate that required columns exist in the dataset."""
-        missing_cols = [col for col in REQUIRED_COLUMNS if col not in self.df.columns]
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in self.table.column_names]
         if missing_cols:
             raise ValueError(
                 f"Missing required columns in {self.filepath}: {missing_cols}"
@@ -39,9 +199,60 @@ class MTDataset:
         Returns:
             List of MT system names
         """
-        return [col for col in self.df.columns if col not in REQUIRED_COLUMNS]
+        return [col for col in self.table.column_names if col not in REQUIRED_COLUMNS]
+    
+    def _valid_mask(self, columns: List[str]) -> np.ndarray:
+        """
+        Get a mask of rows that have values in all given columns.
+        
+        Args:
+            columns: Column names to check
+        
+        Returns:
+            Boolean array, True for rows without missing values
+        """
+        mask = self._valid[columns[0]].copy()
+        for column in columns[1:]:
+            mask &= self._valid[column]
+        return mask
     
-    def prepare_data(self, mt_system: str = None) -> Tuple[List[str], List[str], List[str]]:
+    def _get_texts(self, column: str, rows: np.ndarray) -> List[str]:
+        """
+        Get the texts of a column for the given rows.
+        
+        Args:
+            column: Column name
+            rows: Row positions to return
+        
+        Returns:
+            List of texts, one per row
+        """
+        return pc.cast(self.table[column].take(rows), pa.string()).to_pylist()
+    
+    def _get_tokens(self, column: str, rows: np.ndarray) -> List[List[str]]:
+        """
+        Get tokenized texts of a column for the given rows, using the cache.
+        
+        Args:
+            column: Column name
+            rows: Row positions to return
+        
+        Returns:
+            List of token lists, one per row
+        """
+        if column not in self._tok_cache:
+            self._tok_cache[column] = [
+                tokenize(text) if text is not None else None
+                for text in pc.cast(self.table[column], pa.string()).to_pylist()
+            ]
+        
+        column_tokens = self._tok_cache[column]
+        return [column_tokens[pos] for pos in rows]
+    
+    def prepare_data(
+        self,
+        mt_system: str = None
+    ) -> Tuple[List[str], List[str], List[str], List[List[str]], List[List[str]]]:
         """
         Prepare data for evaluation, handling missing values.
         
@@ -49,28 +260,31 @@ class MTDataset:
             mt_system: Name of MT system column. If None, only returns sources and references.
         
         Returns:
-            Tuple of (sources, references, hypotheses) if mt_system provided,
-            or (sources, references, []) if mt_system is None
+            Tuple of (sources, references, hypotheses, ref_tokens, hyp_tokens) if
+            mt_system provided, or (sources, references, [], ref_tokens, []) if
+            mt_system is None
         """
-        # Clean data: remove rows with NaN in Source or Reference
-        df_clean = self.df.dropna(subset=REQUIRED_COLUMNS)
-        
+        # Clean data: keep rows with values in Source and Reference
+        # (and in the MT system column, if given)
         if mt_system is None:
-            sources = df_clean['Source'].astype(str).tolist()
-            references = df_clean['Reference'].astype(str).tolist()
-            return sources, references, []
+            rows = np.flatnonzero(self._valid_mask(REQUIRED_COLUMNS))
+            sources = self._get_texts('Source', rows)
+            references = self._get_texts('Reference', rows)
+            ref_tokens = self._get_tokens('Reference', rows)
+            return sources, references, [], ref_tokens, []
         
-        # Further remove rows with NaN in the MT system column
-        df_mt = df_clean.dropna(subset=[mt_system])
+        rows = np.flatnonzero(self._valid_mask(REQUIRED_COLUMNS + [mt_system]))
         
-        if len(df_mt) == 0:
+        if len(rows) == 0:
             raise ValueError(f"No valid translations found for MT system: {mt_system}")
         
-        sources = df_mt['Source'].astype(str).tolist()
-        references = df_mt['Reference'].astype(str).tolist()
-        hypotheses = df_mt[mt_system].astype(str).tolist()
+        sources = self._get_texts('Source', rows)
+        references = self._get_texts('Reference', rows)
+        hypotheses = self._get_texts(mt_system, rows)
+        ref_tokens = self._get_tokens('Reference', rows)
+        hyp_tokens = self._get_tokens(mt_system, rows)
         
-        return sources, references, hypotheses
+        return sources, references, hypotheses, ref_tokens, hyp_tokens
     
     def get_dataset_info(self) -> Dict:
         """
@@ -80,30 +294,42 @@ class MTDataset:
             Dictionary with dataset statistics
         """
         return {
-            'total_rows': len(self.df),
-            'valid_rows': len(self.df.dropna(subset=REQUIRED_COLUMNS)),
+            'total_rows': self.table.num_rows,
+            'valid_rows': int(self._valid_mask(REQUIRED_COLUMNS).sum()),
             'mt_systems': self.get_mt_systems(),
             'num_mt_systems': len(self.get_mt_systems())
         }
 
 
-def load_datasets(language_files: Dict[str, Path]) -> Dict[str, MTDataset]:
+def load_datasets(
+    language_files: Dict[str, Path],
+    chunksize: Optional[int] = CSV_CHUNKSIZE
+) -> Dict[str, MTDataset]:
     """
     Load multiple datasets from file paths.
+    Files are read concurrently (Arrow parsing releases the GIL).
     
     Args:
         language_files: Dictionary mapping language names to file paths
+        chunksize: If set, stream each CSV in chunks of this many rows
     
     Returns:
         Dictionary mapping language names to MTDataset objects
     """
-    datasets = {}
-    for language, filepath in language_files.items():
-        try:
-            datasets[language] = MTDataset(filepath)
-        except FileNotFoundError:
-            print(f"Warning: File not found for {language}: {filepath}")
-        except Exception as e:
-            print(f"Error loading {language} dataset: {e}")
+    loaded = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(language_files))) as executor:
+        futures = {
+            executor.submit(MTDataset, filepath, chunksize): language
+            for language, filepath in language_files.items()
+        }
+        for future in as_completed(futures):
+            language = futures[future]
+            try:
+                loaded[language] = future.result()
+            except FileNotFoundError:
+                print(f"Warning: File not found for {language}: {language_files[language]}")
+            except Exception as e:
+                print(f"Error loading {language} dataset: {e}")
     
-    return datasets
+    # Keep the configured language order
+    return {language: loaded[language] for language in language_files if language in loaded}
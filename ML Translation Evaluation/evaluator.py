@@ -2,12 +2,27 @@
 Evaluator module.
 Orchestrates the evaluation process for MT systems.
 """
+import logging
 import pandas as pd
-from typing import List, Dict, Any
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from typing import List, Dict, Any, Tuple
 from pathlib import Path
 from data_loader import MTDataset
-from metrics import compute_all_metrics
-from config import OUTPUT_DECIMAL_PLACES
+from metrics import (
+    compute_all_metrics,
+    compute_lexical_metrics,
+    compute_comet_systems,
+    compute_comet_qe_systems
+)
+from config import OUTPUT_DECIMAL_PLACES, LOG_LEVEL
+
+# Handlers are configured by utils.setup_environment
+logger = logging.getLogger(__name__)
+logger.setLevel(LOG_LEVEL)
+
+# Fixed schema of a result record, as returned by MTEvaluator.evaluate_system
+_COLUMNS = ('Language', 'MT_System', 'BLEU', 'METEOR', 'COMET', 'COMET_QE', 'Num_Samples')
 
 
 class MTEvaluator:
@@ -34,8 +49,11 @@ class MTEvaluator:
         sources: List[str],
         references: List[str],
         hypotheses: List[str],
+        ref_tokens: List[List[str]] = None,
+        hyp_tokens: List[List[str]] = None,
+        neural_scores: Dict[str, float] = None,
         verbose: bool = True
-    ) -> Dict:
+    ) -> Tuple:
         """
         Evaluate a single MT system.
         
@@ -45,74 +63,144 @@ class MTEvaluator:
             sources: List of source texts
             references: List of reference translations
             hypotheses: List of hypothesis translations
-            verbose: If True, print progress messages
+            ref_tokens: Pre-tokenized references (tokenized if None)
+            hyp_tokens: Pre-tokenized hypotheses (tokenized if None)
+            neural_scores: Precomputed COMET and COMET_QE scores. If None,
+                they are computed for this system alone.
+            verbose: If True, log progress messages
         
         Returns:
-            Dictionary with evaluation results
+            Result record with fields in _COLUMNS order
         """
         if verbose:
-            print(f"  Evaluating {mt_system}...")
-        
-        # Compute all metrics
-        scores = compute_all_metrics(
-            sources,
-            references,
-            hypotheses,
-            self.comet_model,
-            self.comet_qe_model
-        )
+            logger.info(f"  Evaluating {mt_system}...")
         
-        # Round scores according to configuration
-        for metric, value in scores.items():
-            decimals = OUTPUT_DECIMAL_PLACES.get(metric, 4)
-            scores[metric] = round(value, decimals)
+        # Compute all metrics, reusing COMET scores when already available
+        if neural_scores is not None:
+            scores = {
+                **compute_lexical_metrics(references, hypotheses, ref_tokens, hyp_tokens),
+                **neural_scores
+            }
+        else:
+            scores = compute_all_metrics(
+                sources,
+                references,
+                hypotheses,
+                self.comet_model,
+                self.comet_qe_model,
+                ref_tokens=ref_tokens,
+                hyp_tokens=hyp_tokens
+            )
         
         # Create result entry
-        result = {
-            'Language': language,
-            'MT_System': mt_system,
-            **scores,
-            'Num_Samples': len(hypotheses)
-        }
+        result = (
+            language,
+            mt_system,
+            scores['BLEU'],
+            scores['METEOR'],
+            scores['COMET'],
+            scores['COMET_QE'],
+            len(hypotheses)
+        )
         
         if verbose:
-            print(f"    ✓ BLEU: {scores['BLEU']:.2f}, "
-                  f"METEOR: {scores['METEOR']:.4f}, "
-                  f"COMET: {scores['COMET']:.4f}, "
-                  f"COMET-QE: {scores['COMET_QE']:.4f}")
+            logger.info(f"    ✓ BLEU: {scores['BLEU']:.2f}, "
+                        f"METEOR: {scores['METEOR']:.4f}, "
+                        f"COMET: {scores['COMET']:.4f}, "
+                        f"COMET-QE: {scores['COMET_QE']:.4f}")
         
         return result
     
+    def compute_neural_scores(
+        self,
+        prepared: Dict[str, Tuple],
+        verbose: bool = True
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Compute COMET and COMET-QE scores for all MT systems of one language.
+        All systems are scored with a single prediction call per model.
+        
+        Args:
+            prepared: Dictionary mapping MT system names to prepared data
+                (as returned by MTDataset.prepare_data)
+            verbose: If True, log progress messages
+        
+        Returns:
+            Dictionary mapping MT system names to their COMET and COMET_QE scores,
+            or an empty dictionary if batched scoring failed
+        """
+        if not prepared:
+            return {}
+        
+        sources_list = [data[0] for data in prepared.values()]
+        references_list = [data[1] for data in prepared.values()]
+        hypotheses_list = [data[2] for data in prepared.values()]
+        
+        try:
+            comet_scores = compute_comet_systems(
+                sources_list, references_list, hypotheses_list, self.comet_model
+            )
+            comet_qe_scores = compute_comet_qe_systems(
+                sources_list, hypotheses_list, self.comet_qe_model
+            )
+        except Exception as e:
+            if verbose:
+                logger.warning(f"  Warning: Batched COMET scoring failed, "
+                               f"falling back to per-system scoring: {e}")
+            return {}
+        
+        return {
+            mt_system: {'COMET': comet, 'COMET_QE': comet_qe}
+            for mt_system, comet, comet_qe in zip(prepared, comet_scores, comet_qe_scores)
+        }
+    
     def evaluate_dataset(
         self,
         language: str,
         dataset: MTDataset,
         verbose: bool = True
-    ) -> List[Dict]:
+    ) -> List[Tuple]:
         """
         Evaluate all MT systems in a dataset.
         
         Args:
             language: Language name
             dataset: MTDataset instance
-            verbose: If True, print progress messages
+            verbose: If True, log progress messages
         
         Returns:
-            List of result dictionaries
+            List of result records (fields in _COLUMNS order)
         """
         if verbose:
-            print(f"Processing {language}...")
+            logger.info(f"Processing {language}...")
         
         mt_systems = dataset.get_mt_systems()
         
         if verbose:
-            print(f"  Found {len(mt_systems)} MT system(s): {', '.join(mt_systems)}")
+            logger.info(f"  Found {len(mt_systems)} MT system(s): {', '.join(mt_systems)}")
         
         dataset_results = []
         
+        # Cached COMET embeddings only pay off within a language
+        for model in (self.comet_model, self.comet_qe_model):
+            if hasattr(model, 'clear_cache'):
+                model.clear_cache()
+        
+        # Reference tokens are cached by the dataset, so they are
+        # only tokenized once per language across all MT systems
+        prepared = {}
         for mt_system in mt_systems:
             try:
-                sources, references, hypotheses = dataset.prepare_data(mt_system)
+                prepared[mt_system] = dataset.prepare_data(mt_system)
+            except ValueError as e:
+                if verbose:
+                    logger.warning(f"    Warning: {e}")
+        
+        neural_scores = self.compute_neural_scores(prepared, verbose=verbose)
+        
+        for mt_system, data in prepared.items():
+            try:
+                sources, references, hypotheses, ref_tokens, hyp_tokens = data
                 
                 result = self.evaluate_system(
                     language,
@@ -120,6 +208,9 @@ class MTEvaluator:
                     sources,
                     references,
                     hypotheses,
+                    ref_tokens=ref_tokens,
+                    hyp_tokens=hyp_tokens,
+                    neural_scores=neural_scores.get(mt_system),
                     verbose=verbose
                 )
                 
@@ -128,15 +219,15 @@ class MTEvaluator:
                 
             except ValueError as e:
                 if verbose:
-                    print(f"    Warning: {e}")
+                    logger.warning(f"    Warning: {e}")
                 continue
             except Exception as e:
                 if verbose:
-                    print(f"    Error evaluating {mt_system}: {e}")
+                    logger.error(f"    Error evaluating {mt_system}: {e}")
                 continue
         
         if verbose:
-            print(f"  Completed {language}\n")
+            logger.info(f"  Completed {language}")
         
         return dataset_results
     
@@ -150,30 +241,32 @@ class MTEvaluator:
         
         Args:
             datasets: Dictionary mapping language names to MTDataset objects
-            verbose: If True, print progress messages
+            verbose: If True, log progress messages
         
         Returns:
             DataFrame with all results
         """
         if verbose:
-            print("Starting evaluation...\n")
+            logger.info("Starting evaluation...")
         
         for language, dataset in datasets.items():
             self.evaluate_dataset(language, dataset, verbose=verbose)
         
         if verbose:
-            print("Evaluation complete!")
+            logger.info("Evaluation complete!")
         
         return self.get_results_dataframe()
     
     def get_results_dataframe(self) -> pd.DataFrame:
         """
         Get results as a pandas DataFrame.
+        Scores are rounded according to OUTPUT_DECIMAL_PLACES.
         
         Returns:
             DataFrame with all evaluation results
         """
-        return pd.DataFrame(self.results)
+        results_df = pd.DataFrame.from_records(self.results, columns=_COLUMNS)
+        return results_df.round(OUTPUT_DECIMAL_PLACES)
     
     def save_results(
         self,
@@ -192,7 +285,10 @@ class MTEvaluator:
         # Create output directory if it doesn't exist
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        results_df.to_csv(output_path, index=False)
+        pacsv.write_csv(
+            pa.Table.from_pandas(results_df, preserve_index=False),
+            str(output_path)
+        )
         
         if verbose:
             print(f"\nResults saved to: {output_path}")
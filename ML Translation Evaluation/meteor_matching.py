@@ -0,0 +1,96 @@
+"""
+METEOR matching module.
+Stem and WordNet synonym matching stages of METEOR, adapted from
+nltk.translate.meteor_score (Apache License 2.0) so the scores do not
+depend on NLTK's private helpers. Only NLTK is imported here, which keeps
+the worker processes started by metrics.compute_meteor lightweight.
+"""
+from collections import defaultdict
+from itertools import chain
+from typing import List, Tuple, Set
+from nltk.corpus import wordnet
+from nltk.stem.porter import PorterStemmer
+
+_STEMMER = PorterStemmer()
+
+# (position, word) pairs of the words still unaligned in a sentence
+EnumList = List[Tuple[int, str]]
+
+
+def init_worker() -> None:
+    """Load WordNet once per worker process instead of on the first match."""
+    wordnet.ensure_loaded()
+
+
+def _synonyms(word: str) -> Set[str]:
+    """Get the single-word WordNet synonyms of a word, including itself."""
+    return set(chain.from_iterable(
+        (lemma.name() for lemma in synset.lemmas() if lemma.name().find("_") < 0)
+        for synset in wordnet.synsets(word)
+    )).union({word})
+
+
+def _match_words(
+    hyp_left: EnumList,
+    ref_left: EnumList,
+    candidates
+) -> Tuple[List[Tuple[int, int]], EnumList, EnumList]:
+    """
+    Align hypothesis words (from the last) to the latest still-unused
+    reference word among their candidate forms, as NLTK does.
+
+    Args:
+        hyp_left: Unaligned hypothesis words
+        ref_left: Unaligned reference words
+        candidates: Function mapping a hypothesis word to the reference
+            word forms it may align with
+
+    Returns:
+        Tuple of (matches, unaligned hypothesis words, unaligned reference words)
+    """
+    ref_positions = defaultdict(list)
+    for j, (_, word) in enumerate(ref_left):
+        ref_positions[word].append(j)
+
+    matches = []
+    matched_hyp = set()
+    matched_ref = set()
+    for i in range(len(hyp_left) - 1, -1, -1):
+        best_j = -1
+        best_word = None
+        for form in candidates(hyp_left[i][1]):
+            positions = ref_positions.get(form)
+            if positions and positions[-1] > best_j:
+                best_j = positions[-1]
+                best_word = form
+        if best_word is not None:
+            ref_positions[best_word].pop()
+            matched_hyp.add(i)
+            matched_ref.add(best_j)
+            matches.append((hyp_left[i][0], ref_left[best_j][0]))
+
+    hyp_left = [pair for i, pair in enumerate(hyp_left) if i not in matched_hyp]
+    ref_left = [pair for j, pair in enumerate(ref_left) if j not in matched_ref]
+    return matches, hyp_left, ref_left
+
+
+def match_residual(pair: Tuple[EnumList, EnumList]) -> List[Tuple[int, int]]:
+    """
+    Stem and WordNet synonym alignment stages for words left unaligned
+    by the exact-match stage.
+    
+    Args:
+        pair: Tuple of (hypothesis, reference) lists of (position, lowercased word)
+    
+    Returns:
+        List of (hypothesis position, reference position) matches
+    """
+    hyp_left, ref_left = pair
+    
+    # Like NLTK, the synonym stage sees the stemmed forms left by the stem stage
+    hyp_left = [(i, _STEMMER.stem(word)) for i, word in hyp_left]
+    ref_left = [(j, _STEMMER.stem(word)) for j, word in ref_left]
+    stem_matches, hyp_left, ref_left = _match_words(hyp_left, ref_left, lambda word: (word,))
+    synonym_matches, _, _ = _match_words(hyp_left, ref_left, _synonyms)
+    
+    return stem_matches + synonym_matches
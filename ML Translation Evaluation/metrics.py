@@ -3,13 +3,27 @@ Metrics module for MT evaluation.
 Contains functions to compute BLEU, METEOR, COMET, and COMET-QE scores.
 """
 import os
-import sys
+import contextlib
+import multiprocessing
+import numba
 import numpy as np
 import torch
-from typing import List, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Any, Tuple, Dict
 from sacrebleu.metrics import BLEU
-from nltk.translate.meteor_score import meteor_score
-from config import COMET_BATCH_SIZE, COMET_USE_GPU
+from meteor_matching import init_worker, match_residual
+from data_loader import tokenize
+from utils import get_inference_dtype
+from config import COMET_BATCH_SIZE, COMET_NUM_WORKERS, COMET_USE_GPU, METEOR_NUM_WORKERS
+
+# Queried once; CUDA availability does not change during a run
+_CUDA_AVAILABLE = torch.cuda.is_available()
+
+# Opened once and reused to silence COMET/Lightning output during prediction
+_DEVNULL = open(os.devnull, 'w')
+
+# Shared BLEU scorer so the tokenizer is built once rather than on every call
+_BLEU = BLEU(tokenize='13a')
 
 
 def compute_bleu(references: List[str], hypotheses: List[str]) -> float:
@@ -23,32 +37,287 @@ def compute_bleu(references: List[str], hypotheses: List[str]) -> float:
     Returns:
         BLEU score (0-100 scale)
     """
-    bleu = BLEU()
     # sacrebleu expects references as list of lists
-    score = bleu.corpus_score(hypotheses, [references])
+    score = _BLEU.corpus_score(hypotheses, [references])
     return score.score
 
 
-def compute_meteor(references: List[str], hypotheses: List[str]) -> float:
+# METEOR parameters (NLTK defaults)
+_METEOR_ALPHA = 0.9
+_METEOR_BETA = 3.0
+_METEOR_GAMMA = 0.5
+
+# Smallest per-task chunk that makes a METEOR worker pool worth starting
+_METEOR_POOL_MIN_CHUNKSIZE = 8
+
+# Upper bound on METEOR workers when METEOR_NUM_WORKERS is None
+_METEOR_DEFAULT_MAX_WORKERS = 4
+
+
+def _encode_tokens(
+    token_lists: List[List[str]],
+    vocab: Dict[str, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map lowercased tokens to integer ids, flattened with per-sentence offsets.
+    
+    Args:
+        token_lists: List of tokenized sentences
+        vocab: Token to id mapping, extended in place with unseen tokens
+    
+    Returns:
+        Tuple of (token ids, offsets) where sentence i spans ids[offsets[i]:offsets[i + 1]]
+    """
+    offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(tokens) for tokens in token_lists])
+    ids = np.fromiter(
+        (vocab.setdefault(token.lower(), len(vocab)) for tokens in token_lists for token in tokens),
+        dtype=np.int32,
+        count=offsets[-1]
+    )
+    return ids, offsets
+
+
+@numba.njit(cache=True)
+def _exact_align(
+    ref_ids: np.ndarray,
+    ref_off: np.ndarray,
+    hyp_ids: np.ndarray,
+    hyp_off: np.ndarray
+) -> np.ndarray:
+    """
+    Exact-match alignment stage of METEOR, in the same order as NLTK.
+    
+    Returns:
+        For each hypothesis token, the position of its aligned token within
+        the sentence's reference, or -1 if unaligned
+    """
+    hyp_align = np.full(len(hyp_ids), -1, dtype=np.int64)
+    for s in range(len(hyp_off) - 1):
+        r0, r1 = ref_off[s], ref_off[s + 1]
+        h0, h1 = hyp_off[s], hyp_off[s + 1]
+        used = np.zeros(r1 - r0, dtype=np.bool_)
+        for i in range(h1 - 1, h0 - 1, -1):
+            for j in range(r1 - 1, r0 - 1, -1):
+                if not used[j - r0] and ref_ids[j] == hyp_ids[i]:
+                    used[j - r0] = True
+                    hyp_align[i] = j - r0
+                    break
+    return hyp_align
+
+
+@numba.njit(cache=True)
+def _meteor_from_alignment(
+    hyp_align: np.ndarray,
+    hyp_off: np.ndarray,
+    ref_len: np.ndarray,
+    alpha: float,
+    beta: float,
+    gamma: float
+) -> np.ndarray:
+    """
+    Sentence-level METEOR scores from a complete word alignment.
+    
+    Returns:
+        METEOR score of each sentence
+    """
+    n = len(hyp_off) - 1
+    scores = np.zeros(n)
+    for s in range(n):
+        h0, h1 = hyp_off[s], hyp_off[s + 1]
+        matches = 0
+        chunks = 0
+        prev_i = -2
+        prev_j = -2
+        for i in range(h0, h1):
+            j = hyp_align[i]
+            if j < 0:
+                continue
+            if i != prev_i + 1 or j != prev_j + 1:
+                chunks += 1
+            matches += 1
+            prev_i = i
+            prev_j = j
+        
+        if matches == 0:
+            continue
+        
+        precision = matches / (h1 - h0)
+        recall = matches / ref_len[s]
+        fmean = (precision * recall) / (alpha * precision + (1 - alpha) * recall)
+        penalty = gamma * (chunks / matches) ** beta
+        scores[s] = (1 - penalty) * fmean
+    return scores
+
+
+def compute_meteor(
+    ref_tokens: List[List[str]],
+    hyp_tokens: List[List[str]],
+    num_workers: int = METEOR_NUM_WORKERS
+) -> float:
     """
     Compute corpus-level METEOR score.
     
+    Exact matching and scoring run as compiled loops over integer
+    token ids; the stem and WordNet stages only see the words left unaligned
+    and run in worker processes for large corpora. Scores match NLTK's
+    meteor_score.
+    
     Args:
-        references: List of reference translations
-        hypotheses: List of hypothesis translations
+        ref_tokens: List of tokenized reference translations
+        hyp_tokens: List of tokenized hypothesis translations
+        num_workers: Number of worker processes (None uses up to 4 CPU cores)
     
     Returns:
         Average METEOR score (0-1 scale)
     """
-    scores = []
-    for ref, hyp in zip(references, hypotheses):
-        # Tokenize for METEOR
-        ref_tokens = ref.split()
-        hyp_tokens = hyp.split()
-        score = meteor_score([ref_tokens], hyp_tokens)
-        scores.append(score)
+    vocab: Dict[str, int] = {}
+    ref_ids, ref_off = _encode_tokens(ref_tokens, vocab)
+    hyp_ids, hyp_off = _encode_tokens(hyp_tokens, vocab)
+    
+    hyp_align = _exact_align(ref_ids, ref_off, hyp_ids, hyp_off)
+    
+    # Collect the unaligned words of each sentence for the residual stages
+    ref_used = np.zeros(len(ref_ids), dtype=bool)
+    aligned = np.flatnonzero(hyp_align >= 0)
+    sentence_of = np.searchsorted(hyp_off, aligned, side='right') - 1
+    ref_used[ref_off[sentence_of] + hyp_align[aligned]] = True
+    
+    residual_sentences = []
+    residual_pairs = []
+    for s, (refs, hyps) in enumerate(zip(ref_tokens, hyp_tokens)):
+        hyp_left = [
+            (i, token.lower()) for i, token in enumerate(hyps)
+            if hyp_align[hyp_off[s] + i] < 0
+        ]
+        ref_left = [
+            (j, token.lower()) for j, token in enumerate(refs)
+            if not ref_used[ref_off[s] + j]
+        ]
+        if hyp_left and ref_left:
+            residual_sentences.append(s)
+            residual_pairs.append((hyp_left, ref_left))
+    
+    num_workers = num_workers or min(os.cpu_count() or 1, _METEOR_DEFAULT_MAX_WORKERS)
+    
+    # Starting a pool costs more than it saves on small workloads,
+    # so those run inline
+    use_pool = (
+        num_workers > 1
+        and len(residual_pairs) >= 4 * num_workers * _METEOR_POOL_MIN_CHUNKSIZE
+    )
+    
+    if not use_pool:
+        residual_matches = [match_residual(pair) for pair in residual_pairs]
+    else:
+        chunksize = max(1, len(residual_pairs) // (4 * num_workers))
+        # Spawn rather than fork: this process holds Numba/CUDA threads,
+        # which are not safe to fork
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker
+        ) as executor:
+            residual_matches = list(
+                executor.map(match_residual, residual_pairs, chunksize=chunksize)
+            )
+    
+    for s, matches in zip(residual_sentences, residual_matches):
+        for i, j in matches:
+            hyp_align[hyp_off[s] + i] = j
+    
+    scores = _meteor_from_alignment(
+        hyp_align,
+        hyp_off,
+        np.diff(ref_off),
+        _METEOR_ALPHA,
+        _METEOR_BETA,
+        _METEOR_GAMMA
+    )
+    return float(np.mean(scores))
+
+
+def _predict(model: Any, data: List[dict], batch_size: int, use_gpu: bool) -> List[float]:
+    """
+    Run COMET prediction with output suppressed.
+    Duplicate samples are scored once, and samples are sorted by length so
+    that batches hold similarly sized sentences and little compute is spent
+    on padding.
+    
+    Args:
+        model: COMET model instance
+        data: List of samples ({"src", "mt"[, "ref"]} dicts)
+        batch_size: Batch size for prediction
+        use_gpu: Whether to use GPU if available
+    
+    Returns:
+        Segment scores, in the same order as data
+    """
+    # Map every sample to its first identical occurrence
+    unique_index: Dict[Tuple[str, ...], int] = {}
+    unique_data = []
+    inverse = np.empty(len(data), dtype=np.int64)
+    for k, sample in enumerate(data):
+        key = tuple(sample.values())
+        if key not in unique_index:
+            unique_index[key] = len(unique_data)
+            unique_data.append(sample)
+        inverse[k] = unique_index[key]
+    
+    lengths = [sum(len(text) for text in sample.values()) for sample in unique_data]
+    order = np.argsort(lengths, kind='stable')
+    sorted_data = [unique_data[i] for i in order]
+    
+    # Use GPU if available and requested
+    gpus = 1 if (use_gpu and _CUDA_AVAILABLE) else 0
+    
+    # Only override COMET's worker default on GPU: on CPU it uses none, and
+    # on Windows worker processes make COMET return zero scores
+    predict_kwargs = {}
+    if COMET_NUM_WORKERS is not None and gpus > 0 and os.name != 'nt':
+        predict_kwargs['num_workers'] = COMET_NUM_WORKERS
+    
+    # Mixed precision matches the reduced-precision encoder set up at load time
+    dtype = get_inference_dtype() if gpus else None
+    
+    # Suppress all output during prediction
+    with contextlib.redirect_stderr(_DEVNULL), torch.inference_mode(), torch.autocast(
+        device_type='cuda',
+        dtype=dtype or torch.float16,
+        enabled=dtype is not None
+    ):
+        output = model.predict(
+            sorted_data,
+            batch_size=batch_size,
+            gpus=gpus,
+            # Keep our combined src/mt/ref ordering; COMET's own length
+            # batching would re-sort by source length only
+            length_batching=False,
+            **predict_kwargs
+        )
+    
+    # Restore the original sample order and expand duplicates
+    unique_scores = np.empty(len(unique_data))
+    unique_scores[order] = output.scores
+    return unique_scores[inverse].tolist()
+
+
+def _split_system_scores(scores: List[float], lengths: List[int]) -> List[float]:
+    """
+    Split concatenated segment scores back into per-system averages.
+    
+    Args:
+        scores: Segment scores of all systems, concatenated in order
+        lengths: Number of segments belonging to each system
     
-    return np.mean(scores)
+    Returns:
+        Average score of each system
+    """
+    offsets = np.cumsum([0] + lengths)
+    return [
+        float(np.mean(scores[start:end]))
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
 
 
 def compute_comet(
@@ -73,28 +342,13 @@ def compute_comet(
     Returns:
         COMET score
     """
-    data = []
-    for src, ref, hyp in zip(sources, references, hypotheses):
-        data.append({
-            "src": src,
-            "mt": hyp,
-            "ref": ref
-        })
+    data = [
+        {"src": src, "mt": hyp, "ref": ref}
+        for src, ref, hyp in zip(sources, references, hypotheses)
+    ]
     
-    # Use GPU if available and requested
-    gpus = 1 if (use_gpu and torch.cuda.is_available()) else 0
-    
-    # Suppress all output during prediction
-    original_stderr = sys.stderr
-    sys.stderr = open(os.devnull, 'w')
-    
-    try:
-        output = model.predict(data, batch_size=batch_size, gpus=gpus)
-    finally:
-        sys.stderr.close()
-        sys.stderr = original_stderr
-    
-    return output.system_score
+    scores = _predict(model, data, batch_size, use_gpu)
+    return float(np.mean(scores))
 
 
 def compute_comet_qe(
@@ -117,27 +371,101 @@ def compute_comet_qe(
     Returns:
         COMET-QE score
     """
-    data = []
-    for src, hyp in zip(sources, hypotheses):
-        data.append({
-            "src": src,
-            "mt": hyp
-        })
+    data = [{"src": src, "mt": hyp} for src, hyp in zip(sources, hypotheses)]
     
-    # Use GPU if available and requested
-    gpus = 1 if (use_gpu and torch.cuda.is_available()) else 0
+    scores = _predict(model, data, batch_size, use_gpu)
+    return float(np.mean(scores))
+
+
+def compute_comet_systems(
+    sources_list: List[List[str]],
+    references_list: List[List[str]],
+    hypotheses_list: List[List[str]],
+    model: Any,
+    batch_size: int = COMET_BATCH_SIZE,
+    use_gpu: bool = COMET_USE_GPU
+) -> List[float]:
+    """
+    Compute COMET scores for several MT systems with a single prediction call.
     
-    # Suppress all output during prediction
-    original_stderr = sys.stderr
-    sys.stderr = open(os.devnull, 'w')
+    Args:
+        sources_list: Source texts for each system
+        references_list: Reference translations for each system
+        hypotheses_list: Hypothesis translations for each system
+        model: COMET model instance
+        batch_size: Batch size for prediction
+        use_gpu: Whether to use GPU if available
+    
+    Returns:
+        COMET score of each system
+    """
+    data = [
+        {"src": src, "mt": hyp, "ref": ref}
+        for sources, references, hypotheses in zip(sources_list, references_list, hypotheses_list)
+        for src, ref, hyp in zip(sources, references, hypotheses)
+    ]
+    
+    scores = _predict(model, data, batch_size, use_gpu)
+    return _split_system_scores(scores, [len(hyps) for hyps in hypotheses_list])
+
+
+def compute_comet_qe_systems(
+    sources_list: List[List[str]],
+    hypotheses_list: List[List[str]],
+    model: Any,
+    batch_size: int = COMET_BATCH_SIZE,
+    use_gpu: bool = COMET_USE_GPU
+) -> List[float]:
+    """
+    Compute COMET-QE scores for several MT systems with a single prediction call.
     
-    try:
-        output = model.predict(data, batch_size=batch_size, gpus=gpus)
-    finally:
-        sys.stderr.close()
-        sys.stderr = original_stderr
+    Args:
+        sources_list: Source texts for each system
+        hypotheses_list: Hypothesis translations for each system
+        model: COMET-QE model instance
+        batch_size: Batch size for prediction
+        use_gpu: Whether to use GPU if available
+    
+    Returns:
+        COMET-QE score of each system
+    """
+    data = [
+        {"src": src, "mt": hyp}
+        for sources, hypotheses in zip(sources_list, hypotheses_list)
+        for src, hyp in zip(sources, hypotheses)
+    ]
     
-    return output.system_score
+    scores = _predict(model, data, batch_size, use_gpu)
+    return _split_system_scores(scores, [len(hyps) for hyps in hypotheses_list])
+
+
+def compute_lexical_metrics(
+    references: List[str],
+    hypotheses: List[str],
+    ref_tokens: List[List[str]] = None,
+    hyp_tokens: List[List[str]] = None
+) -> dict:
+    """
+    Compute the reference-based lexical metrics (BLEU and METEOR).
+    
+    Args:
+        references: List of reference translations
+        hypotheses: List of hypothesis translations
+        ref_tokens: Pre-tokenized references (tokenized here if None)
+        hyp_tokens: Pre-tokenized hypotheses (tokenized here if None)
+    
+    Returns:
+        Dictionary containing BLEU and METEOR scores
+    """
+    if ref_tokens is None:
+        ref_tokens = [tokenize(ref) for ref in references]
+    if hyp_tokens is None:
+        hyp_tokens = [tokenize(hyp) for hyp in hypotheses]
+    
+    return {
+        'BLEU': compute_bleu(references, hypotheses),
+        'METEOR': compute_meteor(ref_tokens, hyp_tokens)
+    }
 
 
 def compute_all_metrics(
@@ -145,7 +473,9 @@ def compute_all_metrics(
     references: List[str],
     hypotheses: List[str],
     comet_model: Any,
-    comet_qe_model: Any
+    comet_qe_model: Any,
+    ref_tokens: List[List[str]] = None,
+    hyp_tokens: List[List[str]] = None
 ) -> dict:
     """
     Compute all evaluation metrics for a given dataset.
@@ -156,13 +486,14 @@ def compute_all_metrics(
         hypotheses: List of hypothesis translations
         comet_model: COMET model instance
         comet_qe_model: COMET-QE model instance
+        ref_tokens: Pre-tokenized references (tokenized here if None)
+        hyp_tokens: Pre-tokenized hypotheses (tokenized here if None)
     
     Returns:
         Dictionary containing all metric scores
     """
     return {
-        'BLEU': compute_bleu(references, hypotheses),
-        'METEOR': compute_meteor(references, hypotheses),
+        **compute_lexical_metrics(references, hypotheses, ref_tokens, hyp_tokens),
         'COMET': compute_comet(sources, references, hypotheses, comet_model),
         'COMET_QE': compute_comet_qe(sources, hypotheses, comet_qe_model)
     }
\ No newline at end of file
@@ -4,10 +4,20 @@ Handles downloading and loading of COMET models and NLTK data.
 """
 import os
 import sys
+import hashlib
 import nltk
+import torch
 from comet import download_model, load_from_checkpoint
-from typing import Tuple, Any
-from config import COMET_MODEL, COMET_QE_MODEL, NLTK_PACKAGES
+from typing import Tuple, Any, Dict, List, Optional
+from config import (
+    COMET_MODEL,
+    COMET_QE_MODEL,
+    COMET_CACHE_EMBEDDINGS,
+    COMET_COMPILE,
+    COMET_USE_GPU,
+    NLTK_PACKAGES
+)
+from utils import get_inference_dtype
 
 # Suppress PyTorch Lightning warnings and logging BEFORE importing models
 os.environ['PYTORCH_ENABLE_MPS_FALLBACK'] = '1'
@@ -32,6 +42,105 @@ def download_nltk_data(quiet: bool = True) -> None:
     print("NLTK data downloaded successfully!")
 
 
+def optimize_for_inference(model: Any) -> Any:
+    """
+    Cast the COMET encoder to reduced precision and optionally compile it for GPU inference.
+    
+    Args:
+        model: COMET model instance
+    
+    Returns:
+        The same model with its encoder optimized in place
+    """
+    dtype = get_inference_dtype()
+    if dtype is not None:
+        model.encoder.model = model.encoder.model.to(dtype=dtype)
+    
+    if COMET_COMPILE and COMET_USE_GPU and torch.cuda.is_available() and hasattr(torch, 'compile'):
+        # Batch and sequence lengths vary, so compile shape-generic kernels
+        # once instead of recompiling (and capturing CUDA graphs) per shape
+        model.encoder.model = torch.compile(model.encoder.model, dynamic=True)
+    
+    return model
+
+
+class CachedCometModel:
+    """
+    Wrapper around a COMET model that memoizes sentence embeddings.
+    
+    Within a language, every MT system shares the same sources and references,
+    so their encoder outputs are computed once and reused; only unseen
+    sentences (typically the MT outputs) go through the encoder. All other
+    attributes, including predict(), are delegated to the wrapped model.
+    """
+    
+    def __init__(self, model: Any):
+        """
+        Wrap a COMET model and install the embedding cache.
+        
+        Args:
+            model: COMET model instance
+        """
+        self.model = model
+        self._cache: Dict[bytes, torch.Tensor] = {}
+        self._encode = model.get_sentence_embedding
+        model.get_sentence_embedding = self._cached_sentence_embedding
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+    
+    def clear_cache(self) -> None:
+        """Drop all cached embeddings (e.g. when moving to a new language)."""
+        self._cache.clear()
+    
+    @staticmethod
+    def _key(token_ids) -> bytes:
+        """Hash the unpadded token ids of one sentence."""
+        return hashlib.blake2b(token_ids.tobytes(), digest_size=16).digest()
+    
+    def _cached_sentence_embedding(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        token_type_ids: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """
+        Drop-in replacement for the model's get_sentence_embedding().
+        
+        Args:
+            input_ids: Padded token ids of the batch
+            attention_mask: Attention mask of the batch
+            token_type_ids: Token type ids (disables caching when given)
+        
+        Returns:
+            Sentence embeddings of the batch
+        """
+        if token_type_ids is not None:
+            return self._encode(input_ids, attention_mask, token_type_ids)
+        
+        lengths = attention_mask.sum(dim=1).tolist()
+        ids = input_ids.cpu().numpy()
+        keys = [self._key(row[:length]) for row, length in zip(ids, lengths)]
+        
+        # Encode each unseen sentence once, trimmed to the longest of them
+        missing: Dict[bytes, int] = {}
+        for i, key in enumerate(keys):
+            if key not in self._cache and key not in missing:
+                missing[key] = i
+        
+        if missing:
+            rows: List[int] = list(missing.values())
+            max_length = max(lengths[i] for i in rows)
+            embeddings = self._encode(
+                input_ids[rows, :max_length],
+                attention_mask[rows, :max_length]
+            )
+            for key, embedding in zip(missing, embeddings):
+                self._cache[key] = embedding
+        
+        return torch.stack([self._cache[key] for key in keys])
+
+
 def load_comet_models(verbose: bool = True) -> Tuple[Any, Any, str, str]:
     """
     Download and load COMET models.
@@ -53,16 +162,20 @@ def load_comet_models(verbose: bool = True) -> Tuple[Any, Any, str, str]:
     try:
         # Reference-based COMET model
         comet_model_path = download_model(COMET_MODEL)
-        comet_model = load_from_checkpoint(comet_model_path)
+        comet_model = optimize_for_inference(load_from_checkpoint(comet_model_path))
         
         # Quality Estimation COMET model (reference-free)
         comet_qe_model_path = download_model(COMET_QE_MODEL)
-        comet_qe_model = load_from_checkpoint(comet_qe_model_path)
+        comet_qe_model = optimize_for_inference(load_from_checkpoint(comet_qe_model_path))
     finally:
         if not verbose:
             sys.stderr.close()
             sys.stderr = original_stderr
     
+    if COMET_CACHE_EMBEDDINGS:
+        comet_model = CachedCometModel(comet_model)
+        comet_qe_model = CachedCometModel(comet_qe_model)
+    
     if verbose:
         print("COMET models loaded successfully!")
     
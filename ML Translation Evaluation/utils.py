@@ -2,29 +2,43 @@
 Utility functions for the MT evaluation pipeline.
 """
 import os
+import sys
 import gc
+import functools
 import shutil
+import logging
 import torch
 import warnings
 from pathlib import Path
-from config import SUPPRESS_WARNINGS
+from typing import Optional
+from config import SUPPRESS_WARNINGS, COMET_USE_GPU, COMET_MIXED_PRECISION
 
 
 def setup_environment() -> None:
     """
     Set up the environment for evaluation.
-    Configures warnings and checks GPU availability.
+    Configures warnings and logging and checks GPU availability.
     """
     if SUPPRESS_WARNINGS:
         warnings.filterwarnings('ignore')
     
+    # Print evaluation progress (INFO from the evaluator, see LOG_LEVEL) to
+    # stdout; this is a no-op if the caller already configured logging
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', stream=sys.stdout)
+    
     print_gpu_info()
 
 
+@functools.lru_cache(maxsize=None)
+def _get_device_name() -> str:
+    """Get the name of the first CUDA device (queried once)."""
+    return torch.cuda.get_device_name(0)
+
+
 def print_gpu_info() -> None:
     """Print information about GPU availability."""
     if torch.cuda.is_available():
-        device = torch.cuda.get_device_name(0)
+        device = _get_device_name()
         print(f"Using device: cuda")
         print(f"GPU: {device}")
     else:
@@ -32,6 +46,20 @@ def print_gpu_info() -> None:
         print("Note: GPU not available, evaluation will run on CPU")
 
 
+@functools.lru_cache(maxsize=None)
+def get_inference_dtype() -> Optional[torch.dtype]:
+    """
+    Get the reduced-precision dtype to use for COMET inference.
+    
+    Returns:
+        torch.bfloat16 on GPUs that support it, torch.float16 on other GPUs,
+        or None if mixed precision is disabled or no GPU is used
+    """
+    if not (COMET_USE_GPU and COMET_MIXED_PRECISION and torch.cuda.is_available()):
+        return None
+    return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+
+
 def cleanup_models(
     comet_model=None,
     comet_qe_model=None,